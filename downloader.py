@@ -1,103 +1,399 @@
 # downloader.py
 import os
+import functools
 import json
+import queue
 import requests
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 from flickr_client import (
     get_photos, get_photo_info, get_photo_comments, 
     get_photo_favorites, get_photo_exif, get_photo_sizes,
     get_photo_geo, get_favorites, get_photo_stats,
-    get_photo_contexts, get_photosets, get_user_info
+    get_photo_contexts, get_photosets, get_user_info,
+    MAX_CONCURRENCY
 )
 from config import USER_ID
 
+# orjson is optional but encodes/decodes several times faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 DATA_DIR = 'flickr_archive'
 PHOTOS_DIR = os.path.join(DATA_DIR, 'my_photos')
 FAVORITES_DIR = os.path.join(DATA_DIR, 'favorited_photos')
-RATE_DELAY = 1.2 
 
-# Cache for user info to avoid duplicate API calls
-USER_CACHE = {}
+# Index rows are appended here as photos finish, so create_index doesn't have
+# to re-read every metadata.json
+PHOTOS_INDEX_LOG = os.path.join(DATA_DIR, 'my_photos_index.jsonl')
+FAVORITES_INDEX_LOG = os.path.join(DATA_DIR, 'favorites_index.jsonl')
+
+# Shared HTTP session so photo downloads reuse keep-alive connections to
+# Flickr's CDN hosts instead of paying a TCP+TLS handshake per file
+SESSION = requests.Session()
+SESSION.headers['User-Agent'] = 'flickr-archive-metadata'
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504])
+))
+
+# Worker pool for the independent API calls made for each photo; how many
+# actually run at once is governed by flickr_client's concurrency controller
+API_POOL = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY)
+
+# Photos are processed a few at a time so there are always API calls in
+# flight; each one fans its own calls out to API_POOL
+PHOTO_WORKERS = 4
+PHOTO_POOL = ThreadPoolExecutor(max_workers=PHOTO_WORKERS)
+
+# Per-photo files are written by a single background thread so API work
+# doesn't wait on the disk. Directories with a failed write are remembered
+# so their photo isn't flagged complete
+WRITE_QUEUE = queue.Queue()
+failed_writes = set()
+
+# How many pages of a photo listing to fetch ahead of the one being processed
+PAGE_PREFETCH = 2
+
+# Cache for user info to avoid duplicate API calls, kept on disk between runs.
+# Least recently used users are dropped once it grows past USER_CACHE_MAXSIZE
+USER_CACHE = OrderedDict()
+USER_CACHE_MAXSIZE = 20000
+USER_CACHE_PATH = os.path.join(DATA_DIR, 'users_cache.json')
+USER_CACHE_TTL = 30 * 24 * 60 * 60  # refetch user info after 30 days
+USER_CACHE_FLUSH_EVERY = 50  # new users between saves
+USER_CACHE_LOCK = threading.RLock()
+unsaved_users = 0
+
+# Fetches in progress, so photos that hit the same new user at the same time
+# share one API call
+USER_FETCHES = {}
+
+def load_user_cache():
+    """Load user info cached by previous runs"""
+    if os.path.exists(USER_CACHE_PATH):
+        try:
+            USER_CACHE.update(load_json(USER_CACHE_PATH))
+        except ValueError as e:
+            print(f"Ignoring unreadable {USER_CACHE_PATH}: {e}")
+            return
+        trim_user_cache()
+        print(f"Loaded info for {len(USER_CACHE)} cached users")
+
+def trim_user_cache():
+    """Evict least recently used users beyond USER_CACHE_MAXSIZE"""
+    while len(USER_CACHE) > USER_CACHE_MAXSIZE:
+        USER_CACHE.popitem(last=False)
+
+def write_user_cache(users, path):
+    """Write users to a temporary file and swap it into place, so a kill
+    mid-write never leaves a truncated cache behind"""
+    temp_path = path + '.tmp'
+    save_json(users, temp_path)
+    os.replace(temp_path, path)
+
+def save_user_cache(background=False):
+    """Write the user cache to disk, or hand it to the background writer"""
+    global unsaved_users
+    # Snapshot under the lock but write outside it, so user lookups from
+    # other photos aren't held up behind the disk
+    with USER_CACHE_LOCK:
+        users = dict(USER_CACHE)
+        unsaved_users = 0
+    if background:
+        WRITE_QUEUE.put((write_user_cache, (users, USER_CACHE_PATH)))
+    else:
+        write_user_cache(users, USER_CACHE_PATH)
+
+def fetch_user_info(user_id):
+    """Fetch a user's details from Flickr in the form we cache"""
+    user_info = get_user_info(user_id)
+    if user_info and 'person' in user_info:
+        person = user_info['person']
+        
+        # Construct avatar URL
+        iconserver = person.get('iconserver', '0')
+        iconfarm = person.get('iconfarm', '1')
+        nsid = person.get('nsid', '')
+        
+        if iconserver and int(iconserver) > 0:
+            avatar_url = f"https://farm{iconfarm}.staticflickr.com/{iconserver}/buddyicons/{nsid}.jpg"
+        else:
+            avatar_url = "https://www.flickr.com/images/buddyicon.gif"
+        
+        # Get display name (realname if available, otherwise username)
+        realname = person.get('realname', {}).get('_content', '')
+        username = person.get('username', {}).get('_content', '')
+        display_name = realname if realname else username
+        
+        entry = {
+            'display_name': display_name,
+            'username': username,
+            'realname': realname,
+            'avatar_url': avatar_url,
+            'is_pro': person.get('ispro', 0),
+            'profile_url': person.get('profileurl', {}).get('_content', '')
+        }
+    else:
+        # Fallback for users we can't fetch
+        entry = {
+            'display_name': user_id,
+            'username': user_id,
+            'realname': '',
+            'avatar_url': "https://www.flickr.com/images/buddyicon.gif",
+            'is_pro': 0,
+            'profile_url': f"https://www.flickr.com/people/{user_id}/"
+        }
+    entry['fetched_at'] = int(time.time())
+    return entry
 
 def get_cached_user_info(user_id):
     """Get user info with caching to minimize API calls"""
-    if user_id not in USER_CACHE:
-        user_info = get_user_info(user_id)
-        if user_info and 'person' in user_info:
-            person = user_info['person']
-            
-            # Construct avatar URL
-            iconserver = person.get('iconserver', '0')
-            iconfarm = person.get('iconfarm', '1')
-            nsid = person.get('nsid', '')
-            
-            if iconserver and int(iconserver) > 0:
-                avatar_url = f"https://farm{iconfarm}.staticflickr.com/{iconserver}/buddyicons/{nsid}.jpg"
-            else:
-                avatar_url = "https://www.flickr.com/images/buddyicon.gif"
-            
-            # Get display name (realname if available, otherwise username)
-            realname = person.get('realname', {}).get('_content', '')
-            username = person.get('username', {}).get('_content', '')
-            display_name = realname if realname else username
-            
-            USER_CACHE[user_id] = {
-                'display_name': display_name,
-                'username': username,
-                'realname': realname,
-                'avatar_url': avatar_url,
-                'is_pro': person.get('ispro', 0),
-                'profile_url': person.get('profileurl', {}).get('_content', '')
-            }
-        else:
-            # Fallback for users we can't fetch
-            USER_CACHE[user_id] = {
-                'display_name': user_id,
-                'username': user_id,
-                'realname': '',
-                'avatar_url': "https://www.flickr.com/images/buddyicon.gif",
-                'is_pro': 0,
-                'profile_url': f"https://www.flickr.com/people/{user_id}/"
-            }
+    global unsaved_users
+    with USER_CACHE_LOCK:
+        cached = USER_CACHE.get(user_id)
+        if cached and time.time() - cached.get('fetched_at', 0) <= USER_CACHE_TTL:
+            USER_CACHE.move_to_end(user_id)
+            return cached
+        
+        pending = USER_FETCHES.get(user_id)
+        if pending is None:
+            USER_FETCHES[user_id] = fetch = Future()
+    
+    # Someone else is already fetching this user, wait for their result
+    if pending is not None:
+        return pending.result()
+    
+    # Fetch outside the lock so other photos aren't held up behind this call
+    try:
+        entry = fetch_user_info(user_id)
+    except Exception as e:
+        with USER_CACHE_LOCK:
+            del USER_FETCHES[user_id]
+        fetch.set_exception(e)
+        raise
+    
+    with USER_CACHE_LOCK:
+        USER_CACHE[user_id] = entry
+        USER_CACHE.move_to_end(user_id)
+        trim_user_cache()
+        del USER_FETCHES[user_id]
+        unsaved_users += 1
+        flush = unsaved_users >= USER_CACHE_FLUSH_EVERY
+    
+    # Save as we go so a crash doesn't lose what we've fetched
+    if flush:
+        save_user_cache(background=True)
     
-    return USER_CACHE[user_id]
+    fetch.set_result(entry)
+    return entry
 
-def save_json(data, path):
-    """Save data as JSON with proper encoding"""
-    os.makedirs(os.path.dirname(path), exist_ok=True)
+def load_json(path):
+    """Load JSON data from path"""
+    if orjson:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+@functools.lru_cache(maxsize=1024)
+def ensure_dir(path):
+    """Create a directory if needed, hitting the filesystem once per path"""
+    os.makedirs(path, exist_ok=True)
+
+def save_json(data, path, compact=False):
+    """Save data as JSON with proper encoding - indented for reading unless
+    compact is set, for files that are mostly read by machines"""
+    ensure_dir(os.path.dirname(path))
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS if compact else orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=option))
+        return
     with open(path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+        if compact:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        else:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+def queue_json(data, path, compact=False):
+    """Hand data to the background writer to be saved as JSON"""
+    WRITE_QUEUE.put((functools.partial(save_json, compact=compact), (data, path)))
+
+def write_complete_flag(path):
+    """Write a photo's complete.flag, unless one of its files failed to save"""
+    if os.path.dirname(path) in failed_writes:
+        return
+    with open(path, 'w') as f:
+        f.write(datetime.now().isoformat())
+
+def write_worker():
+    """Run queued writes one at a time, in the order they were queued"""
+    while True:
+        write, args = WRITE_QUEUE.get()
+        try:
+            write(*args)
+        except Exception as e:
+            print(f"  Error writing {args[-1]}: {e}")
+            failed_writes.add(os.path.dirname(args[-1]))
+        finally:
+            WRITE_QUEUE.task_done()
+
+threading.Thread(target=write_worker, daemon=True).start()
+
+def json_line(data):
+    """Encode data as compact single-line JSON bytes"""
+    if orjson:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+def append_json_line(data, path):
+    """Append data to a JSON Lines file"""
+    with open(path, 'ab') as f:
+        f.write(json_line(data) + b'\n')
+
+def save_json_array(rows, path):
+    """Stream rows to path as a JSON array, one row per line, without
+    building the whole list in memory. Returns the number of rows written"""
+    count = 0
+    with open(path, 'wb') as f:
+        f.write(b'[')
+        for row in rows:
+            f.write(b',\n' if count else b'\n')
+            f.write(json_line(row))
+            count += 1
+        f.write(b'\n]' if count else b']')
+    return count
 
 def download_photo(url, path):
-    """Download a photo from URL to path"""
+    """Download a photo from URL to path, unless the copy we have is current"""
+    etag_path = path + '.etag'
+    headers = {}
+    if os.path.exists(path) and os.path.exists(etag_path):
+        with open(etag_path, 'r') as f:
+            headers['If-None-Match'] = f.read().strip()
     try:
-        response = requests.get(url, stream=True)
+        response = SESSION.get(url, headers=headers, stream=True, timeout=(5, 30))
+        if response.status_code == 304:
+            response.close()
+            return True
         response.raise_for_status()
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
+        ensure_dir(os.path.dirname(path))
+        
+        # Download to a temporary name so a killed run never leaves a
+        # truncated file that looks like a finished download
+        partial_path = path + '.partial'
+        with open(partial_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=65536):
                 f.write(chunk)
+        os.replace(partial_path, path)
+        
+        etag = response.headers.get('ETag')
+        if etag:
+            with open(etag_path, 'w') as f:
+                f.write(etag)
         return True
     except Exception as e:
         print(f"  Error downloading photo: {e}")
         return False
 
-def process_photo(photo, base_dir, is_favorite=False):
+# Size suffixes requested in PHOTO_EXTRAS and the labels getSizes uses for them
+EXTRA_SIZES = [
+    ('sq', 'Square'), ('q', 'Large Square'), ('t', 'Thumbnail'),
+    ('s', 'Small'), ('n', 'Small 320'), ('m', 'Medium'), ('z', 'Medium 640'),
+    ('c', 'Medium 800'), ('l', 'Large'), ('h', 'Large 1600'),
+    ('k', 'Large 2048'), ('3k', 'X-Large 3K'), ('4k', 'X-Large 4K'),
+    ('5k', 'X-Large 5K'), ('6k', 'X-Large 6K'), ('o', 'Original')
+]
+
+def info_from_extras(photo, is_favorite=False):
+    """Shape a listing row fetched with PHOTO_EXTRAS like a getInfo response.
+    Only used for untagged photos - the tags extra is Flickr's normalized
+    form, so tagged photos still go through getInfo for the raw tags"""
+    owner = photo.get('owner', '')
+    path_alias = photo.get('pathalias') or owner
+    return {'photo': {
+        'id': photo['id'],
+        'title': {'_content': photo.get('title', '')},
+        'description': photo.get('description', {}),
+        'dateuploaded': photo.get('dateupload', ''),
+        'dates': {'taken': photo.get('datetaken', '')},
+        'views': photo.get('views', 0),
+        'owner': {
+            'nsid': owner,
+            'username': photo.get('ownername', ''),
+            'path_alias': photo.get('pathalias'),
+            'iconserver': photo.get('iconserver'),
+            'iconfarm': photo.get('iconfarm')
+        },
+        'urls': {'url': [{
+            'type': 'photopage',
+            '_content': f"https://www.flickr.com/photos/{path_alias}/{photo['id']}/"
+        }]},
+        'media': photo.get('media', 'photo'),
+        # You can't fave your own photos, and every favorite is faved by you
+        'isfavorite': int(is_favorite)
+    }}
+
+def sizes_from_extras(photo):
+    """Shape the url_* extras of a listing row like a getSizes response"""
+    sizes = [
+        {
+            'label': label,
+            'width': photo.get(f'width_{suffix}'),
+            'height': photo.get(f'height_{suffix}'),
+            'source': photo[f'url_{suffix}']
+        }
+        for suffix, label in EXTRA_SIZES if photo.get(f'url_{suffix}')
+    ]
+    return {'sizes': {'size': sizes}} if sizes else None
+
+def has_location(photo):
+    """Whether a listing row's geo extras place the photo anywhere"""
+    return bool(float(photo.get('latitude') or 0) or float(photo.get('longitude') or 0))
+
+def process_photo(photo, base_dir, is_favorite=False, progress=''):
     """Process a single photo - fetch all metadata and download"""
     photo_id = photo['id']
-    time.sleep(RATE_DELAY) 
     photo_dir = os.path.join(base_dir, photo_id)
     
     # Skip if already processed
     if os.path.exists(os.path.join(photo_dir, 'complete.flag')):
-        print(f"  Skipping {photo_id} - already processed")
+        print(f"\n{progress}  Skipping {photo_id} - already processed")
         return
     
-    print(f"  Processing photo {photo_id}...")
+    print(f"\n{progress}  Processing photo {photo_id}...")
+    ensure_dir(photo_dir)
     
-    # Get all photo data
-    info = get_photo_info(photo_id)
+    # Listing rows fetched with PHOTO_EXTRAS already hold most of what getInfo
+    # and getSizes return, so only make those calls for rows without them.
+    # Tagged photos still need getInfo for their tags as the owner typed them,
+    # and videos still need getSizes for their video stream entries
+    has_extras = 'dateupload' in photo
+    needs_info = not has_extras or bool(photo.get('tags', '').strip())
+    extra_sizes = sizes_from_extras(photo) if photo.get('media') != 'video' else None
+    
+    # Get all photo data - these calls don't depend on each other, so issue
+    # them together rather than waiting on each round-trip in turn
+    info_future = API_POOL.submit(get_photo_info, photo_id) if needs_info else None
+    geo_future = None
+    if not has_extras or has_location(photo):
+        geo_future = API_POOL.submit(get_photo_geo, photo_id)
+    contexts_future = API_POOL.submit(get_photo_contexts, photo_id)
+    comments_future = API_POOL.submit(get_photo_comments, photo_id)
+    faves_future = API_POOL.submit(get_photo_favorites, photo_id)
+    exif_future = API_POOL.submit(get_photo_exif, photo_id)
+    sizes_future = None if extra_sizes else API_POOL.submit(get_photo_sizes, photo_id)
+    
+    info = info_future.result() if info_future else info_from_extras(photo, is_favorite)
     
     # Create combined metadata
     metadata = {
@@ -127,7 +423,7 @@ def process_photo(photo, base_dir, is_favorite=False):
         metadata['owner_name'] = photo.get('ownername', '')
     
     # Get geolocation
-    geo_data = get_photo_geo(photo_id)
+    geo_data = geo_future.result() if geo_future else None
     if geo_data and 'photo' in geo_data:
         metadata['location'] = {
             'latitude': geo_data['photo']['location'].get('latitude'),
@@ -140,7 +436,7 @@ def process_photo(photo, base_dir, is_favorite=False):
         }
     
     # Get album/photoset information
-    contexts = get_photo_contexts(photo_id)
+    contexts = contexts_future.result()
     albums = []
     if 'set' in contexts:
         for photoset in contexts['set']:
@@ -157,11 +453,8 @@ def process_photo(photo, base_dir, is_favorite=False):
     # Note: get_photo_stats requires OAuth authentication
     # We're already capturing view count from the photo info above
     
-    # Save metadata
-    save_json(metadata, os.path.join(photo_dir, 'metadata.json'))
-    
     # Get and save comments with user info
-    comments_data = get_photo_comments(photo_id)
+    comments_data = comments_future.result()
     comments = []
     if 'comments' in comments_data and 'comment' in comments_data['comments']:
         for comment in comments_data['comments']['comment']:
@@ -183,10 +476,14 @@ def process_photo(photo, base_dir, is_favorite=False):
                 comment_obj['author_display_name'] = user_info['display_name']
             
             comments.append(comment_obj)
-    save_json(comments, os.path.join(photo_dir, 'comments.json'))
+    queue_json(comments, os.path.join(photo_dir, 'comments.json'), compact=True)
+    
+    # Listing rows don't carry a comment count, but we have every comment
+    if 'comments' not in info['photo']:
+        metadata['stats']['comments'] = len(comments)
     
     # Get and save favorites with user info
-    faves_data = get_photo_favorites(photo_id)
+    faves_data = faves_future.result()
     favorites = []
     if 'photo' in faves_data and 'person' in faves_data['photo']:
         for person in faves_data['photo']['person']:
@@ -207,10 +504,10 @@ def process_photo(photo, base_dir, is_favorite=False):
                 fav_obj['profile_url'] = user_info['profile_url']
             
             favorites.append(fav_obj)
-    save_json(favorites, os.path.join(photo_dir, 'favorites.json'))
+    queue_json(favorites, os.path.join(photo_dir, 'favorites.json'), compact=True)
     
     # Get and save EXIF data
-    exif_data = get_photo_exif(photo_id)
+    exif_data = exif_future.result()
     exif = []
     if 'photo' in exif_data and 'exif' in exif_data['photo']:
         for item in exif_data['photo']['exif']:
@@ -219,13 +516,13 @@ def process_photo(photo, base_dir, is_favorite=False):
                 'label': item.get('label'),
                 'raw': item.get('raw', {}).get('_content', '')
             })
-    save_json(exif, os.path.join(photo_dir, 'exif.json'))
+    queue_json(exif, os.path.join(photo_dir, 'exif.json'), compact=True)
     
     # Check if this is a video
     is_video = info['photo'].get('media', 'photo') == 'video'
     
     if is_video:
-        print(f"    This is a video - attempting to download")
+        print(f"    {photo_id} is a video - attempting to download")
         
         # For videos, we need to get the video page URL and note it
         video_urls = []
@@ -235,22 +532,16 @@ def process_photo(photo, base_dir, is_favorite=False):
                     video_urls.append(url.get('_content'))
         
         # Get sizes - for videos this usually contains poster frames
-        sizes = get_photo_sizes(photo_id)
+        sizes = sizes_future.result() if sizes_future else extra_sizes
         
         # Videos often don't have downloadable sources via the API
         # Save the largest thumbnail as a poster frame
         if sizes['sizes']['size']:
-            sorted_sizes = sorted(
-              sizes['sizes']['size'],
-              key=lambda s: int(s.get('width') or 0),
-              reverse=True
-            )
-            if sorted_sizes:
-                thumb = sorted_sizes[0]
-                thumb_url = thumb['source']
-                thumb_path = os.path.join(photo_dir, 'poster.jpg')
-                if download_photo(thumb_url, thumb_path):
-                    print(f"    Downloaded video poster frame")
+            thumb = max(sizes['sizes']['size'], key=lambda s: int(s.get('width') or 0))
+            thumb_url = thumb['source']
+            thumb_path = os.path.join(photo_dir, 'poster.jpg')
+            if download_photo(thumb_url, thumb_path):
+                print(f"    Downloaded video poster frame for {photo_id}")
         
         # Save video metadata including the Flickr URL for manual download
         video_info = {
@@ -259,7 +550,7 @@ def process_photo(photo, base_dir, is_favorite=False):
             'note': 'Videos must be downloaded manually from Flickr',
             'all_sizes': sizes['sizes']['size']
         }
-        save_json(video_info, os.path.join(photo_dir, 'sizes.json'))
+        queue_json(video_info, os.path.join(photo_dir, 'sizes.json'), compact=True)
         
         # Also note in metadata
         metadata['video_info'] = {
@@ -268,23 +559,14 @@ def process_photo(photo, base_dir, is_favorite=False):
         }
     else:
         # Download original photo
-        sizes = get_photo_sizes(photo_id)
-        original = None
+        sizes = sizes_future.result() if sizes_future else extra_sizes
         
         # Try to find original size, fallback to largest available
-        for size in sizes['sizes']['size']:
-            if size['label'] == 'Original':
-                original = size
-                break
+        original = next((size for size in sizes['sizes']['size'] if size['label'] == 'Original'), None)
         
         if not original and sizes['sizes']['size']:
             # Get the largest size available, handling missing width values
-            sorted_sizes = sorted(
-                sizes['sizes']['size'], 
-                key=lambda s: int(s.get('width', 0)), 
-                reverse=True
-            )
-            original = sorted_sizes[0] if sorted_sizes else None
+            original = max(sizes['sizes']['size'], key=lambda s: int(s.get('width') or 0))
         
         if original:
             photo_url = original['source']
@@ -295,124 +577,213 @@ def process_photo(photo, base_dir, is_favorite=False):
             
             photo_path = os.path.join(photo_dir, f'original.{ext}')
             if download_photo(photo_url, photo_path):
-                print(f"    Downloaded photo")
+                print(f"    Downloaded photo {photo_id}")
             
             # Save size info
-            save_json({
+            queue_json({
                 'original': original,
                 'all_sizes': sizes['sizes']['size']
-            }, os.path.join(photo_dir, 'sizes.json'))
+            }, os.path.join(photo_dir, 'sizes.json'), compact=True)
     
-    # Mark as complete
-    with open(os.path.join(photo_dir, 'complete.flag'), 'w') as f:
-        f.write(datetime.now().isoformat())
+    # Save metadata last, once any video notes have been added to it
+    queue_json(metadata, os.path.join(photo_dir, 'metadata.json'))
+    
+    # Log this photo's index row while we have its metadata in hand
+    if is_favorite:
+        index_row, index_log = favorite_index_row(photo_id, metadata), FAVORITES_INDEX_LOG
+    else:
+        index_row, index_log = photo_index_row(photo_id, metadata), PHOTOS_INDEX_LOG
+    WRITE_QUEUE.put((append_json_line, (index_row, index_log)))
     
-    # Be nice to Flickr's servers
-    time.sleep(0.5)
+    # Mark as complete - queued behind this photo's other writes
+    WRITE_QUEUE.put((write_complete_flag, (os.path.join(photo_dir, 'complete.flag'),)))
+
+def list_completed(base_dir):
+    """Return the ids of photos under base_dir that finished downloading"""
+    if not os.path.isdir(base_dir):
+        return set()
+    with os.scandir(base_dir) as entries:
+        return {
+            entry.name for entry in entries
+            if entry.is_dir() and os.path.exists(os.path.join(entry.path, 'complete.flag'))
+        }
+
+def prefetch_pages(fetch_page):
+    """Yield pages of a photo listing, fetching the next page in the
+    background while the current one is being processed"""
+    pages = queue.Queue(maxsize=PAGE_PREFETCH)
+    done = object()
+
+    def fetch_all():
+        page = 1
+        try:
+            while True:
+                data = fetch_page(page)
+                pages.put(data)
+                if not data['photos']['photo'] or page >= data['photos']['pages']:
+                    break
+                page += 1
+        except Exception as e:
+            pages.put(e)
+        pages.put(done)
+
+    threading.Thread(target=fetch_all, daemon=True).start()
+    while True:
+        item = pages.get()
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+def wait_for_photos(futures):
+    """Wait for a page of photos and return how many failed. A failed photo
+    gets no complete.flag, so the next run picks it up again"""
+    failed = 0
+    try:
+        for photo_id, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                print(f"  Error processing photo {photo_id}, will retry on the next run: {e}")
+                failed += 1
+    except BaseException:
+        # Ctrl+C or a fatal error - drop the photos that haven't started
+        # rather than working through the rest of the page on the way out
+        for future in futures.values():
+            future.cancel()
+        raise
+    return failed
 
 def download_my_photos():
     print(f"\nDownloading photos for user {USER_ID}")
-    processed_ids = set(os.listdir(PHOTOS_DIR))
-    page = 1
+    processed_ids = list_completed(PHOTOS_DIR)
     total_processed = 0
+    total_failed = 0
 
-    while True:
-        print(f"\nFetching page {page}...")
-        photos_data = get_photos(USER_ID, page=page, per_page=100)
+    for photos_data in prefetch_pages(lambda page: get_photos(USER_ID, page=page, per_page=100)):
+        page = photos_data['photos']['page']
         photos = photos_data['photos']['photo']
 
         if not photos:
             break
 
-        print(f"Found {len(photos)} photos on page {page}")
+        print(f"\nFound {len(photos)} photos on page {page}")
 
+        futures = {}
         for i, photo in enumerate(photos, 1):
             photo_id = photo['id']
             if photo_id in processed_ids:
                 continue
 
-            print(f"\n[{total_processed + i}/{photos_data['photos']['total']}]", end='')
-            process_photo(photo, PHOTOS_DIR)
+            progress = f"[{total_processed + i}/{photos_data['photos']['total']}]"
+            futures[photo_id] = PHOTO_POOL.submit(process_photo, photo, PHOTOS_DIR, progress=progress)
 
-        total_processed += len(photos)
+        # Finish this page before moving on to the next one
+        total_failed += wait_for_photos(futures)
 
-        if page >= photos_data['photos']['pages']:
-            break
-        page += 1
+        total_processed += len(photos)
 
     print(f"\nCompleted downloading {total_processed} photos")
+    if total_failed:
+        print(f"{total_failed} photos failed and will be retried on the next run")
 
 
 def download_favorites():
     """Download all favorited photos"""
     print(f"\nDownloading favorited photos for user {USER_ID}")
-    page = 1
+    processed_ids = list_completed(FAVORITES_DIR)
     total_processed = 0
+    total_failed = 0
     
-    while True:
-        print(f"\nFetching favorites page {page}...")
-        faves_data = get_favorites(USER_ID, page=page, per_page=100)
+    for faves_data in prefetch_pages(lambda page: get_favorites(USER_ID, page=page, per_page=100)):
+        page = faves_data['photos']['page']
         photos = faves_data['photos']['photo']
         
         if not photos:
             break
         
-        print(f"Found {len(photos)} favorites on page {page}")
+        print(f"\nFound {len(photos)} favorites on page {page}")
         
+        futures = {}
         for i, photo in enumerate(photos, 1):
-            print(f"\n[Fav {total_processed + i}/{faves_data['photos']['total']}]", end='')
-            process_photo(photo, FAVORITES_DIR, is_favorite=True)
+            if photo['id'] in processed_ids:
+                continue
+            
+            progress = f"[Fav {total_processed + i}/{faves_data['photos']['total']}]"
+            futures[photo['id']] = PHOTO_POOL.submit(process_photo, photo, FAVORITES_DIR, is_favorite=True, progress=progress)
         
-        total_processed += len(photos)
+        # Finish this page before moving on to the next one
+        total_failed += wait_for_photos(futures)
         
-        if page >= faves_data['photos']['pages']:
-            break
-        page += 1
+        total_processed += len(photos)
     
     print(f"\nCompleted downloading {total_processed} favorited photos")
+    if total_failed:
+        print(f"{total_failed} favorites failed and will be retried on the next run")
+
+def photo_index_row(photo_id, metadata):
+    """Summary of one of my photos for my_photos_index.json"""
+    return {
+        'id': photo_id,
+        'title': metadata.get('title', ''),
+        'date_taken': metadata.get('date_taken', ''),
+        'date_uploaded': metadata.get('date_uploaded', ''),
+        'tags': metadata.get('tags', []),
+        'media': metadata.get('media', 'photo'),
+        'views': metadata.get('views', 0),
+        'albums': metadata.get('albums', [])
+    }
+
+def favorite_index_row(photo_id, metadata):
+    """Summary of a favorited photo for favorites_index.json"""
+    return {
+        'id': photo_id,
+        'title': metadata.get('title', ''),
+        'owner_name': metadata.get('owner_name', ''),
+        'date_taken': metadata.get('date_taken', ''),
+        'tags': metadata.get('tags', [])
+    }
+
+def load_index_log(path):
+    """Rows from an index log keyed by photo id, the latest row winning"""
+    rows = {}
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    row = orjson.loads(line) if orjson else json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by an interrupted run
+                rows[row['id']] = row
+    return rows
+
+def index_rows(base_dir, log_path, make_row):
+    """Yield an index row for every completed photo under base_dir, reading
+    metadata.json only for photos missing from the log (e.g. ones archived
+    before the log existed)"""
+    logged = load_index_log(log_path)
+    for photo_id in list_completed(base_dir):
+        row = logged.get(photo_id)
+        if row is None:
+            row = make_row(photo_id, load_json(os.path.join(base_dir, photo_id, 'metadata.json')))
+        yield row
 
 def create_index():
     """Create an index file for easy access"""
     print("\nCreating index files...")
     
     # Index for my photos
-    my_photos_index = []
-    if os.path.exists(PHOTOS_DIR):
-        for photo_id in os.listdir(PHOTOS_DIR):
-            metadata_path = os.path.join(PHOTOS_DIR, photo_id, 'metadata.json')
-            if os.path.exists(metadata_path):
-                with open(metadata_path, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                    my_photos_index.append({
-                        'id': photo_id,
-                        'title': metadata.get('title', ''),
-                        'date_taken': metadata.get('date_taken', ''),
-                        'date_uploaded': metadata.get('date_uploaded', ''),
-                        'tags': metadata.get('tags', []),
-                        'media': metadata.get('media', 'photo'),
-                        'views': metadata.get('views', 0),
-                        'albums': metadata.get('albums', [])
-                    })
-    
-    save_json(my_photos_index, os.path.join(DATA_DIR, 'my_photos_index.json'))
+    photo_count = save_json_array(
+        index_rows(PHOTOS_DIR, PHOTOS_INDEX_LOG, photo_index_row),
+        os.path.join(DATA_DIR, 'my_photos_index.json')
+    )
     
     # Index for favorites
-    favorites_index = []
-    if os.path.exists(FAVORITES_DIR):
-        for photo_id in os.listdir(FAVORITES_DIR):
-            metadata_path = os.path.join(FAVORITES_DIR, photo_id, 'metadata.json')
-            if os.path.exists(metadata_path):
-                with open(metadata_path, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                    favorites_index.append({
-                        'id': photo_id,
-                        'title': metadata.get('title', ''),
-                        'owner_name': metadata.get('owner_name', ''),
-                        'date_taken': metadata.get('date_taken', ''),
-                        'tags': metadata.get('tags', [])
-                    })
-    
-    save_json(favorites_index, os.path.join(DATA_DIR, 'favorites_index.json'))
+    favorite_count = save_json_array(
+        index_rows(FAVORITES_DIR, FAVORITES_INDEX_LOG, favorite_index_row),
+        os.path.join(DATA_DIR, 'favorites_index.json')
+    )
     
     # Create albums index
     print("Creating albums index...")
@@ -437,11 +808,11 @@ def create_index():
     
     save_json(albums_index, os.path.join(DATA_DIR, 'albums_index.json'))
     
-    print(f"Created index for {len(my_photos_index)} photos, {len(favorites_index)} favorites, and {len(albums_index)} albums")
+    print(f"Created index for {photo_count} photos, {favorite_count} favorites, and {len(albums_index)} albums")
     
     # Save user cache
     if USER_CACHE:
-        save_json(USER_CACHE, os.path.join(DATA_DIR, 'users_cache.json'))
+        save_user_cache()
         print(f"Saved info for {len(USER_CACHE)} users to users_cache.json")
 
 if __name__ == '__main__':
@@ -451,10 +822,16 @@ if __name__ == '__main__':
     # Create directories
     os.makedirs(PHOTOS_DIR, exist_ok=True)
     os.makedirs(FAVORITES_DIR, exist_ok=True)
+    load_user_cache()
     
-    # Download everything
-    download_my_photos()
-    download_favorites()
+    # Download everything. Even if that's cut short, let the photos already
+    # in progress finish and the writer flush everything they queued
+    try:
+        download_my_photos()
+        download_favorites()
+    finally:
+        PHOTO_POOL.shutdown(wait=True)
+        WRITE_QUEUE.join()
     create_index()
     
     print("\nArchive complete!")
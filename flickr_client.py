@@ -1,33 +1,223 @@
 # flickr_client.py
 import flickrapi
+import functools
+import http.client
+import json
+import random
+import re
+import socket
+import threading
 import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
 from config import API_KEY, API_SECRET
 
-# Initialize with authentication support
+# orjson is optional but decodes several times faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Initialize with authentication support. flickrapi handles the OAuth flow;
+# API calls themselves go through api() below
 flickr = flickrapi.FlickrAPI(API_KEY, API_SECRET, format='parsed-json')
 
+# Flickr allows 3600 API calls per hour per key
+RATE_LIMIT_PER_MINUTE = 3600 // 60
+
+def parse_retry_after(value):
+    """Convert a Retry-After header (seconds or HTTP date) to seconds"""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class RateLimiter:
+    """Sliding-window limiter shared by every Flickr API call"""
+
+    def __init__(self, max_calls=RATE_LIMIT_PER_MINUTE, window=60):
+        self.max_calls = max_calls
+        self.window = window
+        self.calls = deque()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def wait_if_throttled(self):
+        """Block until another call fits in the trailing window, then claim
+        its slot. Checking and claiming happen under one lock so concurrent
+        callers can't all slip through on the same free slot"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.calls and now - self.calls[0] >= self.window:
+                    self.calls.popleft()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif len(self.calls) < self.max_calls:
+                    self.calls.append(now)
+                    return
+                else:
+                    delay = self.window - (now - self.calls[0])
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """Hold off all calls for the given number of seconds"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def observe(self, response):
+        """Honor the throttling headers on an API response"""
+        retry_after = response.headers.get('Retry-After')
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        if retry_after:
+            delay = parse_retry_after(retry_after)
+            if delay:
+                self.pause(delay)
+        elif remaining is not None and remaining.strip() == '0':
+            self.pause(self.window)
+
+limiter = RateLimiter()
+
+# Bounds for how many API calls may be in flight at once
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 8
+INITIAL_CONCURRENCY = 4
+TARGET_LATENCY = 1.0  # seconds
+ADJUST_EVERY = 20  # calls
+
+class ConcurrencyController:
+    """AIMD limit on concurrent API calls - creeps up while Flickr is fast
+    and error free, halves as soon as it pushes back"""
+
+    def __init__(self, minimum=MIN_CONCURRENCY, maximum=MAX_CONCURRENCY,
+                 initial=INITIAL_CONCURRENCY, target_latency=TARGET_LATENCY,
+                 window=ADJUST_EVERY):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(initial)
+        self.target_latency = target_latency
+        self.latencies = deque(maxlen=window)
+        self.errors = 0
+        self.in_flight = 0
+        self.last_decrease = float('-inf')
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Block until there's room for another call"""
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency, failed=False, throttled=False):
+        """Record how a call went and adjust the limit"""
+        with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                # Calls already in flight when the limit was cut are part of
+                # the same congestion event; only halve again for a call
+                # sent at the reduced limit
+                if time.monotonic() - latency > self.last_decrease:
+                    self._adjust(increase=False)
+            else:
+                self.latencies.append(latency)
+                self.errors += int(failed)
+                if len(self.latencies) == self.latencies.maxlen:
+                    mean_latency = sum(self.latencies) / len(self.latencies)
+                    self._adjust(increase=mean_latency <= self.target_latency and not self.errors)
+            self.condition.notify_all()
+
+    def _adjust(self, increase):
+        if increase:
+            self.limit = min(self.maximum, self.limit + 0.5)
+        else:
+            self.limit = max(self.minimum, self.limit * 0.5)
+            self.last_decrease = time.monotonic()
+        self.latencies.clear()
+        self.errors = 0
+
+concurrency = ConcurrencyController()
+
+def http_status(error):
+    """Pull the HTTP status out of flickrapi's 'Status code N received' errors"""
+    match = re.search(r'Status code (\d+)', str(error))
+    return int(match.group(1)) if match else None
+
+def error_code(error):
+    """Flickr's error code, or the HTTP status when the request itself failed"""
+    code = getattr(error, 'code', None)
+    return code if code is not None else http_status(error)
+
+# Flickr's "service unavailable" codes plus the HTTP statuses that mean
+# try again later. These are retried and also count as Flickr pushing back
+RETRYABLE_CODES = {105, 201, 429, 500, 502, 503, 504}
+
+def is_throttled(error):
+    """True when an error means Flickr wants us to back off"""
+    if isinstance(error, socket.timeout):
+        return True
+    if isinstance(error, flickrapi.exceptions.FlickrError):
+        code = error_code(error)
+        return code in RETRYABLE_CODES or (code or 0) >= 500
+    return False
+
+MAX_ATTEMPTS = 4
+MAX_RETRY_WAIT = 30  # seconds
+
+def is_retryable(error):
+    """True for temporary failures worth another attempt"""
+    if isinstance(error, (http.client.HTTPException, OSError)):
+        return True
+    return (isinstance(error, flickrapi.exceptions.FlickrError)
+            and error_code(error) in RETRYABLE_CODES)
+
+def rate_limited(func):
+    """Decorator to keep API calls within Flickr's rate limit and the
+    current concurrency limit"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Claim the rate limit slot only once admitted, right before the call
+        concurrency.acquire()
+        limiter.wait_if_throttled()
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            concurrency.release(time.monotonic() - started, failed=True,
+                                throttled=is_throttled(e))
+            raise
+        concurrency.release(time.monotonic() - started)
+        return result
+    return wrapper
+
+def retry_delay(error, default):
+    """Use the server's Retry-After when api() attached one to the error"""
+    delay = getattr(error, 'retry_after', None)
+    return delay if delay is not None else default
+
 def retry_on_error(func):
-    """Decorator to retry API calls on temporary failures"""
+    """Decorator to retry API calls on temporary failures, with
+    exponential backoff and jitter between attempts"""
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in range(MAX_ATTEMPTS):
             try:
                 return func(*args, **kwargs)
-            except flickrapi.exceptions.FlickrError as e:
-                if '201' in str(e) or 'not currently available' in str(e):
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 5  # 5, 10, 15 seconds
-                        print(f"  API temporarily unavailable, waiting {wait_time} seconds...")
-                        time.sleep(wait_time)
-                        continue
-                raise
             except Exception as e:
-                if attempt < max_retries - 1:
-                    print(f"  Error: {e}, retrying...")
-                    time.sleep(2)
-                    continue
-                raise
-        return None
+                if attempt == MAX_ATTEMPTS - 1 or not is_retryable(e):
+                    raise
+                # 1, 2, 4... seconds plus up to a second of jitter
+                backoff = min(MAX_RETRY_WAIT, 2 ** attempt + random.uniform(0, 1))
+                wait_time = retry_delay(e, backoff)
+                print(f"  API temporarily unavailable ({e}), waiting {wait_time:.1f} seconds...")
+                time.sleep(wait_time)
     return wrapper
 
 # Check if we need to authenticate
@@ -50,81 +240,192 @@ if not flickr.token_valid(perms='read'):
     flickr.get_access_token(verifier)
     print("Authentication successful!")
 
+# Extra fields requested with every photo listing - enough to build a photo's
+# metadata and find its download URLs without separate getInfo/getSizes calls
+PHOTO_EXTRAS = (
+    'description,license,date_upload,date_taken,owner_name,icon_server,'
+    'original_format,last_update,geo,tags,machine_tags,o_dims,views,media,'
+    'path_alias,url_sq,url_t,url_s,url_q,url_m,url_n,url_z,url_c,url_l,'
+    'url_h,url_k,url_3k,url_4k,url_5k,url_6k,url_o'
+)
+
+REST_HOST = 'api.flickr.com'
+REST_PATH = '/services/rest/'
+API_TIMEOUT = 30  # seconds
+
+# One persistent HTTPS connection to the REST endpoint per thread
+connections = threading.local()
+
+def api_connection():
+    """This thread's connection to the REST endpoint, opened on first use"""
+    if getattr(connections, 'conn', None) is None:
+        connections.conn = http.client.HTTPSConnection(REST_HOST, timeout=API_TIMEOUT)
+    return connections.conn
+
+def as_text(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+def api(method, **params):
+    """Call a Flickr REST method and return the parsed JSON response.
+
+    Every call goes to the same host, so this talks to it over a kept-alive
+    http.client connection and skips the per-call work requests does. Calls
+    are signed with the OAuth client flickrapi authenticated.
+    """
+    params.update(method=method, format='json', nojsoncallback=1)
+    url, signed_headers, _ = flickr.flickr_oauth.oauth.client.sign(
+        f'https://{REST_HOST}{REST_PATH}?{urlencode(params)}', http_method='GET'
+    )
+    # The oauthlib client flickrapi sets up hands back bytes
+    headers = {as_text(key): as_text(value) for key, value in signed_headers.items()}
+    headers['Connection'] = 'keep-alive'
+    path = as_text(url)[len(f'https://{REST_HOST}'):]
+    
+    for attempt in range(2):
+        conn = api_connection()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            break
+        except (http.client.HTTPException, OSError) as e:
+            # Start the next call on a fresh connection
+            conn.close()
+            connections.conn = None
+            # A kept-alive connection the server already closed fails on
+            # first use; that's worth one immediate retry
+            stale = isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError))
+            if attempt or not stale:
+                raise
+    
+    limiter.observe(response)
+    if response.status != 200:
+        error = flickrapi.exceptions.FlickrError(f'do_request: Status code {response.status} received')
+        error.retry_after = parse_retry_after(response.headers.get('Retry-After', ''))
+        raise error
+    
+    data = orjson.loads(body) if orjson else json.loads(body)
+    if data.get('stat') == 'fail':
+        raise flickrapi.exceptions.FlickrError(
+            f"Error: {data.get('code')}: {data.get('message')}", code=data.get('code')
+        )
+    return data
+
+@retry_on_error
+@rate_limited
 def get_photos(user_id, per_page=500, page=1):
     """Get ALL photos for a user (public and private)"""
-    return flickr.people.getPhotos(
+    return api(
+        'flickr.people.getPhotos',
         user_id=user_id, 
         per_page=per_page, 
         page=page,
-        extras='date_upload,date_taken,geo,tags,machine_tags,o_dims,views,media'
+        extras=PHOTO_EXTRAS
     )
 
+@retry_on_error
+@rate_limited
 def get_photo_info(photo_id):
     """Get detailed info about a photo"""
-    return flickr.photos.getInfo(photo_id=photo_id)
+    return api('flickr.photos.getInfo', photo_id=photo_id)
 
+@retry_on_error
+@rate_limited
 def get_photo_comments(photo_id):
     """Get all comments for a photo"""
     try:
-        return flickr.photos.comments.getList(photo_id=photo_id)
-    except:
+        return api('flickr.photos.comments.getList', photo_id=photo_id)
+    except flickrapi.exceptions.FlickrError as e:
+        if is_retryable(e):
+            raise
         return {'comments': {'comment': []}}
 
+@retry_on_error
+@rate_limited
 def get_photo_favorites(photo_id):
     """Get list of users who favorited this photo"""
     try:
-        return flickr.photos.getFavorites(photo_id=photo_id, per_page=500)
-    except:
+        return api('flickr.photos.getFavorites', photo_id=photo_id, per_page=500)
+    except flickrapi.exceptions.FlickrError as e:
+        if is_retryable(e):
+            raise
         return {'photo': {'person': []}}
 
+@retry_on_error
+@rate_limited
 def get_photo_exif(photo_id):
     """Get EXIF data for a photo"""
     try:
-        return flickr.photos.getExif(photo_id=photo_id)
-    except:
+        return api('flickr.photos.getExif', photo_id=photo_id)
+    except flickrapi.exceptions.FlickrError as e:
+        if is_retryable(e):
+            raise
         return {'photo': {'exif': []}}
 
+@retry_on_error
+@rate_limited
 def get_photo_sizes(photo_id):
     """Get all available sizes for a photo"""
-    return flickr.photos.getSizes(photo_id=photo_id)
+    return api('flickr.photos.getSizes', photo_id=photo_id)
 
+@retry_on_error
+@rate_limited
 def get_photo_geo(photo_id):
     """Get geolocation data for a photo"""
     try:
-        return flickr.photos.geo.getLocation(photo_id=photo_id)
-    except:
+        return api('flickr.photos.geo.getLocation', photo_id=photo_id)
+    except flickrapi.exceptions.FlickrError as e:
+        if is_retryable(e):
+            raise
         return None
 
+@retry_on_error
+@rate_limited
 def get_favorites(user_id, per_page=500, page=1):
     """Get photos favorited by the user"""
-    return flickr.favorites.getList(
+    return api(
+        'flickr.favorites.getList',
         user_id=user_id,
         per_page=per_page,
         page=page,
-        extras='date_upload,date_taken,geo,tags,owner_name'
+        extras=PHOTO_EXTRAS
     )
 
+@retry_on_error
+@rate_limited
 def get_photo_stats(photo_id, date=None):
     """Get stats for a photo (requires authentication)"""
     try:
-        return flickr.stats.getPhotoStats(photo_id=photo_id)
-    except:
+        return api('flickr.stats.getPhotoStats', photo_id=photo_id)
+    except flickrapi.exceptions.FlickrError as e:
+        if is_retryable(e):
+            raise
         return None
 
+@retry_on_error
+@rate_limited
 def get_photo_contexts(photo_id):
     """Get all contexts (sets/pools) for a photo"""
     try:
-        return flickr.photos.getAllContexts(photo_id=photo_id)
-    except:
+        return api('flickr.photos.getAllContexts', photo_id=photo_id)
+    except flickrapi.exceptions.FlickrError as e:
+        if is_retryable(e):
+            raise
         return {'set': []}
 
+@retry_on_error
+@rate_limited
 def get_photosets(user_id):
     """Get all photosets (albums) for a user"""
-    return flickr.photosets.getList(user_id=user_id, per_page=500)
+    return api('flickr.photosets.getList', user_id=user_id, per_page=500)
 
+@retry_on_error
+@rate_limited
 def get_user_info(user_id):
     """Get user info including buddy icon"""
     try:
-        return flickr.people.getInfo(user_id=user_id)
-    except:
+        return api('flickr.people.getInfo', user_id=user_id)
+    except flickrapi.exceptions.FlickrError as e:
+        if is_retryable(e):
+            raise
         return None
\ No newline at end of file